@@ -20,6 +20,8 @@ if [ "$ENVIRONMENT" = "staging" ]; then
     CPU="1"
     MAX_INSTANCES="5"
     MIN_INSTANCES="0"
+    DB_POOL_MAX_SIZE="10"
+    SECRETS=""
 elif [ "$ENVIRONMENT" = "production" ]; then
     SERVICE_NAME="datagotchi-backend-prod"
     APP_ENV="production"
@@ -27,6 +29,10 @@ elif [ "$ENVIRONMENT" = "production" ]; then
     CPU="2"
     MAX_INSTANCES="10"
     MIN_INSTANCES="1"
+    # One uvicorn worker per CPU, each with its own pool: 2 x 5 connections per instance
+    DB_POOL_MAX_SIZE="5"
+    # Shared response cache; the app refuses to start in production without it
+    SECRETS="REDIS_URL=redis-url:latest"
 else
     echo "❌ Invalid environment. Use 'staging' or 'production'"
     echo "Usage: ./deploy.sh [staging|production]"
@@ -93,7 +99,8 @@ gcloud run deploy $SERVICE_NAME \
     --max-instances=$MAX_INSTANCES \
     --min-instances=$MIN_INSTANCES \
     --timeout=300 \
-    --set-env-vars="ENVIRONMENT=$ENVIRONMENT,APP_ENV=$APP_ENV"
+    --set-env-vars="ENVIRONMENT=$ENVIRONMENT,APP_ENV=$APP_ENV,WEB_CONCURRENCY=$CPU,DB_POOL_MAX_SIZE=$DB_POOL_MAX_SIZE" \
+    ${SECRETS:+--set-secrets="$SECRETS"}
 
 # Get the service URL
 SERVICE_URL=$(gcloud run services describe $SERVICE_NAME --platform=managed --region=$REGION --format="value(status.url)")
@@ -120,4 +127,5 @@ if [ "$ENVIRONMENT" = "staging" ]; then
 else
     echo -e "${YELLOW}   - SUPABASE_URL_PROD (for production)${NC}"
     echo -e "${YELLOW}   - SUPABASE_KEY_PROD (for production)${NC}"
+    echo -e "${YELLOW}   - REDIS_URL (from the redis-url secret)${NC}"
 fi 
\ No newline at end of file
@@ -0,0 +1,15 @@
+-- Migration: Full text search indexes for pet/user content search
+-- search_pet_content and search_user_content match with to_tsvector(...) @@ plainto_tsquery(...);
+-- the indexed expressions below must stay identical to the ones used in those queries
+
+-- 1. DataInstance content (already part of the base schema on newer databases)
+CREATE INDEX IF NOT EXISTS idx_datainstances_content_fts
+ON public.datainstances
+USING gin (to_tsvector('english', content));
+
+-- 2. Knowledge title + content, replacing the content-only index
+DROP INDEX IF EXISTS public.idx_knowledge_content_fts;
+
+CREATE INDEX IF NOT EXISTS idx_knowledge_title_content_fts
+ON public.knowledge
+USING gin (to_tsvector('english', coalesce(title, '') || ' ' || content));
@@ -0,0 +1,14 @@
+-- Migration: Replace the IVFFlat embeddings index with HNSW
+-- Semantic search now ranks knowledge inside Postgres (ORDER BY embeddings <=> query LIMIT n),
+-- which HNSW serves with better recall than IVFFlat and without needing to be rebuilt as rows are added
+
+-- 1. Drop the IVFFlat index created by add_embeddings.sql
+DROP INDEX IF EXISTS public.idx_knowledge_embeddings;
+
+-- 2. Create the HNSW index for cosine distance
+CREATE INDEX IF NOT EXISTS knowledge_embedding_hnsw
+ON public.knowledge
+USING hnsw (embeddings vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+COMMENT ON INDEX knowledge_embedding_hnsw IS 'HNSW index for cosine similarity search on embeddings';
@@ -0,0 +1,60 @@
+from urllib.parse import urlparse
+
+from aiocache import SimpleMemoryCache, caches
+
+from src.config import settings
+
+
+def _cache_config() -> dict:
+    """Build the aiocache config: Redis when `REDIS_URL` is set, in-process memory otherwise.
+
+    The memory backend is only safe with a single worker and instance; production
+    refuses to start without `REDIS_URL` (see `src.main.lifespan`).
+    """
+    config = {
+        "serializer": {"class": "aiocache.serializers.PickleSerializer"},
+        "plugins": [{"class": "aiocache.plugins.HitMissRatioPlugin"}],
+    }
+    if not settings.redis_url:
+        return {**config, "cache": "aiocache.SimpleMemoryCache"}
+
+    url = urlparse(settings.redis_url)
+    return {
+        **config,
+        "cache": "aiocache.RedisCache",
+        "endpoint": url.hostname or "localhost",
+        "port": url.port or 6379,
+        "db": int(url.path.lstrip("/") or 0),
+        "password": url.password,
+        "ssl": url.scheme == "rediss",
+    }
+
+
+caches.set_config({"default": _cache_config()})
+
+# Shared cache instance behind every `@cached(alias="default")` decorator
+cache = caches.get("default")
+
+
+async def invalidate_pet(pet_id: str) -> None:
+    """Drop every cached read derived from a pet's instances, knowledge and images.
+
+    On Redis the keys are found with SCAN: `clear(namespace=...)` runs KEYS,
+    which blocks the server while it walks the whole keyspace.
+    """
+    namespace = f"pet:{pet_id}"
+    try:
+        if isinstance(cache, SimpleMemoryCache):
+            await cache.clear(namespace=namespace)
+            return
+        keys = [key async for key in cache.client.scan_iter(match=f"{namespace}:*", count=500)]
+        if keys:
+            await cache.client.delete(*keys)
+    except Exception as e:
+        print(f"Error invalidating cache for pet {pet_id}: {str(e)}")
+
+
+def cache_stats() -> dict:
+    """Return the backend in use and its hit/miss counters."""
+    stats = getattr(cache, "hit_miss_ratio", {"total": 0, "hits": 0, "hit_ratio": 0.0})
+    return {"backend": type(cache).__name__, **stats}
@@ -30,14 +30,30 @@ class Settings(BaseSettings):
     # API KEYS
     NOTTE_API_KEY: str | None = Field(None, env="NOTTE_API_KEY")
     
-    # Development Supabase configuration
-    supabase_url_dev: str | None = Field(None, env="SUPABASE_URL")
-    supabase_key_dev: str | None = Field(None, env="SUPABASE_KEY")
+    # Development Supabase configuration (the field names differ from the env
+    # vars, so they are read through a validation alias)
+    supabase_url_dev: str | None = Field(None, validation_alias="SUPABASE_URL")
+    supabase_key_dev: str | None = Field(None, validation_alias="SUPABASE_KEY")
     
     # Production Supabase configuration
     supabase_url_prod: str | None = Field(None, env="SUPABASE_URL_PROD")
     supabase_key_prod: str | None = Field(None, env="SUPABASE_KEY_PROD")
 
+    # Postgres connection pool (sized for the Supavisor pooler)
+    db_pool_min_size: int = Field(2, env="DB_POOL_MIN_SIZE")
+    db_pool_max_size: int = Field(10, env="DB_POOL_MAX_SIZE")
+    db_pool_timeout: float = Field(30.0, env="DB_POOL_TIMEOUT")
+    # Idle seconds before a pooled connection is closed; below Supavisor's idle timeout
+    db_pool_max_idle: float = Field(300.0, env="DB_POOL_MAX_IDLE")
+    # Prepared statements cached per connection; only usable with session-mode pooling
+    db_statement_cache_size: int = Field(0, env="DB_STATEMENT_CACHE_SIZE")
+
+    # Threads available to blocking calls (Notte scrapes) offloaded from the event loop
+    worker_threads: int = Field(40, env="WORKER_THREADS")
+
+    # Response cache backend (in-process memory when unset)
+    redis_url: str | None = Field(None, env="REDIS_URL")
+
     model_config = SettingsConfigDict(
         env_file=".env", 
         env_file_encoding="utf-8", 
@@ -1,12 +1,54 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from src.cache import cache_stats
 from src.config import settings, SHOW_DOCS_ENVIRONMENT
+from src.services.storage import Supabase, acquire, create_pool
 from src.routes import scraper
 from src.routes import storage as storage_routes
 from src.routes import ai as ai_routes
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the Postgres connection pool, the shared outbound HTTP client and
+    the storage service on startup, and close the pool and client on shutdown."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.worker_threads
+
+    url = settings.supabase_url
+    key = settings.supabase_key
+    dsn = os.getenv("SUPABASE_DB_URL")
+    if not url or not key or not dsn:
+        raise RuntimeError(
+            "SUPABASE_URL and SUPABASE_KEY (SUPABASE_URL_PROD and SUPABASE_KEY_PROD when APP_ENV=production) "
+            "and SUPABASE_DB_URL environment variables must be set."
+        )
+    if settings.is_production and not settings.redis_url:
+        # The in-memory cache is per worker, so writes would only invalidate one of them
+        raise RuntimeError("REDIS_URL environment variable must be set in production.")
+
+    app.state.pool = await create_pool(dsn)
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    )
+    app.state.storage = Supabase(
+        url, key, os.getenv("OPENAI_API_KEY"), pool=app.state.pool, http_client=app.state.http
+    )
+    try:
+        yield
+    finally:
+        await app.state.http.aclose()
+        await app.state.pool.close()
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application."""
     
@@ -15,6 +57,8 @@ def create_app() -> FastAPI:
         "title": settings.app_name,
         "version": settings.app_version,
         "debug": settings.debug,
+        "lifespan": lifespan,
+        "default_response_class": ORJSONResponse,
     }
     
     # Hide docs in production
@@ -57,6 +101,23 @@ def create_app() -> FastAPI:
         """Health check endpoint."""
         return {"status": "ok", "environment": settings.environment}
     
+    # Readiness check endpoint
+    @app.get("/healthz", tags=["Health"])
+    async def readiness_check(request: Request):
+        """Readiness check that verifies the database pool can serve queries."""
+        try:
+            async with acquire(request.app.state.pool) as con:
+                await con.fetchval("SELECT 1")
+        except Exception as exc:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc))
+        return {"status": "ok", "database": "ok"}
+    
+    # Cache statistics endpoint
+    @app.get("/status/cache", tags=["Health"])
+    async def cache_status():
+        """Report the response cache backend and its hit/miss ratio."""
+        return cache_stats()
+    
     return app
 
 
@@ -2,12 +2,14 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+from functools import lru_cache
 from openai import OpenAI
 import json
 from datetime import datetime, timezone
 import random
 import time
 
+from src.routes.storage import get_storage
 from src.services.storage.supabase import Supabase
 
 router = APIRouter(prefix="/ai", tags=["AI"])
@@ -161,6 +163,12 @@ class TriviaGameSessionResponse(BaseModel):
     points_awarded: int
 
 
+@lru_cache()
+def _openai_client(api_key: str) -> OpenAI:
+    """Create one OpenAI client per API key so its connection pool is reused across requests."""
+    return OpenAI(api_key=api_key)
+
+
 def get_openai_client() -> OpenAI:
     """Get OpenAI client instance."""
     api_key = os.getenv("OPENAI_API_KEY")
@@ -169,22 +177,7 @@ def get_openai_client() -> OpenAI:
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="OpenAI API is not configured"
         )
-    return OpenAI(api_key=api_key)
-
-
-def get_storage() -> Supabase:
-    """Return a singleton instance of the Supabase storage helper configured
-    from environment variables `SUPABASE_URL` and `SUPABASE_KEY`."""
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if not url or not key:
-        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
-
-    # Re-use a single instance to avoid recreating connections on every request
-    if not hasattr(get_storage, "_instance"):
-        get_storage._instance = Supabase(url, key, openai_key)
-    return get_storage._instance
+    return _openai_client(api_key)
 
 
 def determine_difficulty(level: int, accuracy_rate: float, current_difficulty: str) -> str:
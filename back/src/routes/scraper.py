@@ -1,3 +1,6 @@
+import asyncio
+
+import anyio
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, HttpUrl
 from typing import Optional
@@ -17,13 +20,22 @@ class ScrapeResponse(BaseModel):
 
 scraper_service = NotteScraper()
 
+# Caps concurrent outbound Notte scrapes across all requests in this worker
+_scrape_semaphore = asyncio.Semaphore(20)
+
+
+async def _scrape(url: str, instruction: str):
+    """Run the blocking Notte scrape in a worker thread so it does not stall the event loop."""
+    async with _scrape_semaphore:
+        return await anyio.to_thread.run_sync(scraper_service.scrape, url, instruction)
+
 
 @router.post("/", response_model=ScrapeResponse, status_code=status.HTTP_200_OK)
 async def scrape_endpoint(payload: ScrapeRequest):
     """Scrape a webpage using Notte and return the structured data."""
 
     try:
-        result = scraper_service.scrape(url=str(payload.url), instruction="Extract the text from the url above")
+        result = await _scrape(str(payload.url), "Extract the text from the url above")
     except Exception as exc: 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -37,7 +49,7 @@ async def scrape_twitter_endpoint(payload: ScrapeRequest):
     """Scrape a twitter post using Notte and return the structured data."""
 
     try:
-        result = scraper_service.scrape(url=str(payload.url), instruction="Extract the text from the tweet above")
+        result = await _scrape(str(payload.url), "Extract the text from the tweet above")
     except Exception as exc: 
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
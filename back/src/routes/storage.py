@@ -1,24 +1,20 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from pydantic import BaseModel, Field, HttpUrl
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl, TypeAdapter, model_validator
 from typing import Optional, List, Dict, Any
-import os
 from enum import Enum
+from uuid import UUID
 
-from src.services.storage.supabase import Supabase
+import orjson
+from aiocache import cached
 
-def get_storage() -> Supabase:
-    """Return a singleton instance of the Supabase storage helper configured
-    from environment variables `SUPABASE_URL` and `SUPABASE_KEY`."""
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
-    openai_key = os.getenv("OPENAI_API_KEY")
-    if not url or not key:
-        raise RuntimeError("SUPABASE_URL and SUPABASE_KEY environment variables must be set.")
+from src.cache import invalidate_pet
+from src.services.storage.schemas import has_url_or_content
+from src.services.storage.supabase import Supabase
 
-    # Re-use a single instance to avoid recreating connections on every request
-    if not hasattr(get_storage, "_instance"):
-        get_storage._instance = Supabase(url, key, openai_key)
-    return get_storage._instance
+def get_storage(request: Request) -> Supabase:
+    """Return the Supabase storage helper created in the application lifespan."""
+    return request.app.state.storage
 
 
 class DataCategory(str, Enum):
@@ -38,6 +34,20 @@ class KnowledgeCreate(BaseModel):
     category: DataCategory = DataCategory.general
     tags: List[str] = Field(default_factory=list)
 
+    @model_validator(mode="after")
+    def check_url_or_content(self) -> "KnowledgeCreate":
+        if not has_url_or_content(self.url, self.content):
+            raise ValueError("Each knowledge item must have either a URL or content")
+        return self
+
+
+_KNOWLEDGE_LIST_ADAPTER = TypeAdapter(List[KnowledgeCreate])
+
+
+def _dump_knowledge(items: List[KnowledgeCreate]) -> List[Dict[str, Any]]:
+    """Dump a whole knowledge list in one pydantic-core call (JSON mode turns HttpUrl into str)."""
+    return _KNOWLEDGE_LIST_ADAPTER.dump_python(items, mode='json')
+
 
 class ImageCreate(BaseModel):
     image_url: HttpUrl
@@ -91,63 +101,73 @@ class PetResponse(BaseModel):
 router = APIRouter(prefix="/storage", tags=["Storage"])
 
 
+async def _invalidate_datainstance_pet(datainstance_id: str, storage: Supabase) -> None:
+    """Drop cached reads for the pet that owns `datainstance_id`."""
+    pet_id = await storage.get_datainstance_pet_id(datainstance_id)
+    if pet_id:
+        await invalidate_pet(pet_id)
+
+
 @router.get("/users/{wallet_address}/pets", response_model=List[PetResponse])
+@cached(ttl=30, alias="default", key_builder=lambda f, *a, **kw: f"user:{kw['wallet_address']}:pets")
 async def list_user_pets(wallet_address: str, storage: Supabase = Depends(get_storage)):
     """Return all pets belonging to `wallet_address` (ordered by creation date DESC)."""
     try:
-        return storage.get_user_pets(wallet_address)
+        return await storage.get_user_pets(wallet_address)
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
 
 @router.get("/pets/{pet_id}", response_model=PetResponse)
+@cached(ttl=30, alias="default", key_builder=lambda f, *a, **kw: f"pet:{kw['pet_id']}:detail")
 async def get_pet(pet_id: str, storage: Supabase = Depends(get_storage)):
     """Retrieve a single pet by its ID."""
-    result = storage.get_pet(pet_id)
+    result = await storage.get_pet(pet_id)
     if not result:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pet not found")
     return result
 
 
-@router.get("/pets/{pet_id}/export", response_model=Dict[str, Any])
+@router.get("/pets/{pet_id}/export", response_class=StreamingResponse)
 async def export_pet_data(pet_id: str, storage: Supabase = Depends(get_storage)):
-    """Export complete pet data including all nested instances, knowledge, and images."""
-    result = storage.export_pet_data(pet_id)
-    if not result:
+    """Export complete pet data as newline-delimited JSON: a `{"pet": ...}` line
+    followed by one line per instance with its nested knowledge and images."""
+    pet = await storage.get_pet(pet_id)
+    if not pet:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pet not found")
-    return result
+
+    async def export_lines():
+        yield orjson.dumps({"pet": pet}) + b"\n"
+        async for instance in storage.iter_pet_instances(pet_id):
+            yield orjson.dumps(instance) + b"\n"
+
+    return StreamingResponse(export_lines(), media_type="application/x-ndjson")
 
 
 @router.post("/pets/{pet_id}/instances", response_model=DataInstanceResponse, status_code=status.HTTP_201_CREATED)
 async def create_datainstance(pet_id: str, payload: DataInstanceCreate, storage: Supabase = Depends(get_storage)):
     """Create a DataInstance for the specified pet. Optionally attach knowledge items and images in one request."""
     try:
-        # Convert knowledge list properly
-        knowledge_list = None
-        if payload.knowledge_list:
-            knowledge_list = []
-            for k in payload.knowledge_list:
-                knowledge_dict = k.model_dump()
-                if knowledge_dict.get('url'):
-                    knowledge_dict['url'] = str(knowledge_dict['url'])  # Convert HttpUrl to string
-                knowledge_list.append(knowledge_dict)
+        knowledge_list = _dump_knowledge(payload.knowledge_list) if payload.knowledge_list else None
         
-        instance = storage.create_complete_datainstance(
+        instance = await storage.create_complete_datainstance(
             pet_id=pet_id,
             content=payload.content,
             content_type=payload.content_type,
             knowledge_list=knowledge_list,
-            image_urls=[str(url) for url in payload.image_urls] if payload.image_urls else None,
+            image_urls=list(map(str, payload.image_urls)) if payload.image_urls else None,
             metadata=payload.metadata,
             category=payload.category.value,
             tags=payload.tags,
         )
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    await invalidate_pet(pet_id)
     return instance
 
 
 @router.get("/pets/{pet_id}/instances", response_model=List[Dict[str, Any]])
+@cached(ttl=30, alias="default", key_builder=lambda f, *a, **kw: f"pet:{kw['pet_id']}:instances:{kw['limit']}:{kw['offset']}")
 async def list_pet_instances(
     pet_id: str,
     limit: int = Query(100, ge=1, le=1000),
@@ -155,18 +175,29 @@ async def list_pet_instances(
     storage: Supabase = Depends(get_storage),
 ):
     """Return basic information for DataInstances contained in the pet (paginated)."""
-    return storage.get_pet_instances(pet_id, limit=limit, offset=offset)
+    return await storage.get_pet_instances(pet_id, limit=limit, offset=offset)
 
 
-@router.get("/pets/{pet_id}/knowledge", response_model=List[Dict[str, Any]])
+@router.get("/pets/{pet_id}/knowledge", response_model=Dict[str, Any])
+@cached(ttl=30, alias="default", key_builder=lambda f, *a, **kw: f"pet:{kw['pet_id']}:knowledge:{kw['limit']}:{kw['cursor']}:{kw['fields']}")
 async def list_pet_knowledge(
     pet_id: str,
-    limit: int = Query(100, ge=1, le=1000),
+    limit: int = Query(25, ge=1, le=100),
+    cursor: Optional[UUID] = Query(None, description="`next_cursor` from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of id, url, title, content, metadata, created_at"),
     storage: Supabase = Depends(get_storage),
 ):
-    """Return all knowledge items associated with a pet's data instances."""
+    """Return one page of the knowledge items associated with a pet's data instances,
+    newest first, as `{"items": [...], "next_cursor": ...}`."""
     try:
-        return storage.get_pet_knowledge(pet_id, limit=limit)
+        return await storage.get_pet_knowledge(
+            pet_id,
+            limit=limit,
+            cursor=str(cursor) if cursor else None,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
 
@@ -174,7 +205,7 @@ async def list_pet_knowledge(
 @router.get("/datainstances/{datainstance_id}", response_model=DataInstanceResponse)
 async def get_datainstance(datainstance_id: str, storage: Supabase = Depends(get_storage)):
     """Retrieve a DataInstance along with its related knowledge and images."""
-    instance = storage.get_datainstance_with_content(datainstance_id)
+    instance = await storage.get_datainstance_with_content(datainstance_id)
     if not instance:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="DataInstance not found")
     return instance
@@ -184,7 +215,7 @@ async def get_datainstance(datainstance_id: str, storage: Supabase = Depends(get
 async def get_datainstance_knowledge(datainstance_id: str, storage: Supabase = Depends(get_storage)):
     """Retrieve all knowledge associated with a specific DataInstance."""
     try:
-        knowledge = storage.get_datainstance_knowledge(datainstance_id)
+        knowledge = await storage.get_datainstance_knowledge(datainstance_id)
         return knowledge
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
@@ -194,7 +225,7 @@ async def get_datainstance_knowledge(datainstance_id: str, storage: Supabase = D
 async def get_datainstance_images(datainstance_id: str, storage: Supabase = Depends(get_storage)):
     """Retrieve all images associated with a specific DataInstance."""
     try:
-        images = storage.get_datainstance_images(datainstance_id)
+        images = await storage.get_datainstance_images(datainstance_id)
         return images
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
@@ -203,35 +234,24 @@ async def get_datainstance_images(datainstance_id: str, storage: Supabase = Depe
 @router.post("/datainstances/{datainstance_id}/knowledge", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
 async def add_knowledge(datainstance_id: str, payload: List[KnowledgeCreate], storage: Supabase = Depends(get_storage)):
     """Attach one or more Knowledge documents to an existing DataInstance."""
-    # Validate and convert knowledge data
-    knowledge_data = []
-    for k in payload:
-        # Validate that each knowledge item has either URL or content
-        if not k.url and (not k.content or k.content.strip() == ""):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, 
-                detail="Each knowledge item must have either a URL or content"
-            )
-        
-        knowledge_dict = k.model_dump()
-        if knowledge_dict.get('url'):
-            knowledge_dict['url'] = str(knowledge_dict['url'])  # Convert HttpUrl to string
-        knowledge_data.append(knowledge_dict)
+    knowledge_data = _dump_knowledge(payload)
     
     try:
-        results = storage.bulk_add_knowledge(datainstance_id, knowledge_data)
-        return results
+        results = await storage.bulk_add_knowledge(datainstance_id, knowledge_data)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as exc:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(exc))
+    await _invalidate_datainstance_pet(datainstance_id, storage)
+    return results
 
 
 @router.post("/datainstances/{datainstance_id}/images", response_model=List[Dict[str, Any]], status_code=status.HTTP_200_OK)
 async def add_images(datainstance_id: str, payload: List[ImageCreate], storage: Supabase = Depends(get_storage)):
     """Attach one or more Images to an existing DataInstance."""
     urls = [str(img.image_url) for img in payload]
-    results = storage.bulk_add_images(datainstance_id, urls)
+    results = await storage.bulk_add_images(datainstance_id, urls)
+    await _invalidate_datainstance_pet(datainstance_id, storage)
     return results
 
 
@@ -243,7 +263,7 @@ async def search_pet_content(
     storage: Supabase = Depends(get_storage)
 ):
     """Full-text search across a pet's DataInstances and Knowledge documents."""
-    return storage.search_pet_content(pet_id=pet_id, search_query=q, limit=limit)
+    return await storage.search_pet_content(pet_id=pet_id, search_query=q, limit=limit)
 
 
 @router.get("/users/{wallet_address}/search", response_model=Dict[str, List[Dict[str, Any]]])
@@ -254,13 +274,14 @@ async def search_user_content(
     storage: Supabase = Depends(get_storage)
 ):
     """Full-text search across all DataInstances and Knowledge documents for a user's pets."""
-    return storage.search_user_content(wallet_address=wallet_address, search_query=q, limit=limit)
+    return await storage.search_user_content(wallet_address=wallet_address, search_query=q, limit=limit)
 
 
 @router.get("/users/{wallet_address}/statistics", response_model=Dict[str, Any])
+@cached(ttl=30, alias="default", key_builder=lambda f, *a, **kw: f"user:{kw['wallet_address']}:statistics")
 async def user_statistics(wallet_address: str, storage: Supabase = Depends(get_storage)):
     """Aggregate statistics for the specified user (number of pets, instances, etc.)."""
-    return storage.get_user_statistics(wallet_address)
+    return await storage.get_user_statistics(wallet_address)
 
 
 @router.get("/semantic/search", response_model=List[Dict[str, Any]])
@@ -272,7 +293,7 @@ async def semantic_search_global(
 ):
     """Perform semantic search across all knowledge using OpenAI embeddings."""
     try:
-        return storage.semantic_search_knowledge(
+        return await storage.semantic_search_knowledge(
             query=q, 
             limit=limit, 
             similarity_threshold=similarity_threshold
@@ -293,7 +314,7 @@ async def semantic_search_pet(
 ):
     """Perform semantic search across a specific pet's knowledge using OpenAI embeddings."""
     try:
-        return storage.semantic_search_pet_knowledge(
+        return await storage.semantic_search_pet_knowledge(
             pet_id=pet_id,
             query=q, 
             limit=limit, 
@@ -315,7 +336,7 @@ async def semantic_search_user(
 ):
     """Perform semantic search across all knowledge for a user's pets using OpenAI embeddings."""
     try:
-        return storage.semantic_search_user_knowledge(
+        return await storage.semantic_search_user_knowledge(
             wallet_address=wallet_address,
             query=q, 
             limit=limit, 
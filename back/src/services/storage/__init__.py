@@ -1,5 +1,8 @@
+from .postgres import acquire, create_pool
 from .supabase import Supabase
 
 __all__ = [
     "Supabase",
-] 
\ No newline at end of file
+    "acquire",
+    "create_pool",
+]
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import asyncpg
+
+from src.config import settings
+
+# Seconds the liveness ping may take before the connection is treated as dead
+_PING_TIMEOUT = 2.0
+
+# Errors from a pooled connection that turned out to be dead; `acquire` retries
+# them with another connection
+_DEAD_CONNECTION_ERRORS = (
+    asyncpg.ConnectionDoesNotExistError,
+    asyncpg.InterfaceError,
+    asyncio.TimeoutError,
+    OSError,
+)
+
+
+async def _init_connection(con: asyncpg.Connection) -> None:
+    """Decode json/jsonb columns into Python objects instead of raw strings."""
+    for typename in ("json", "jsonb"):
+        await con.set_type_codec(
+            typename,
+            encoder=json.dumps,
+            decoder=json.loads,
+            schema="pg_catalog",
+        )
+
+
+async def _ping_connection(con: asyncpg.Connection) -> None:
+    """Check that the server side of a pooled connection is still alive before handing it out."""
+    try:
+        await con.execute("SELECT 1", timeout=_PING_TIMEOUT)
+    except BaseException:
+        # Drop the socket right away; a graceful close would wait on the same dead peer
+        con.terminate()
+        raise
+
+
+async def create_pool(dsn: str) -> asyncpg.Pool:
+    """Create the asyncpg connection pool used by the storage service.
+
+    The prepared statement cache is off by default (`db_statement_cache_size=0`)
+    because Supavisor/PgBouncer in transaction mode cannot route named prepared
+    statements back to the backend that created them. When connecting in
+    session mode (port 5432), set `DB_STATEMENT_CACHE_SIZE` (e.g. 100) so each
+    connection prepares a query once and skips parse/plan on later runs.
+    Connections left idle for `db_pool_max_idle` seconds are closed; keep it
+    below the pooler's own idle timeout. Every acquire also pings the
+    connection (`setup=`), so one the pooler dropped anyway is closed instead
+    of failing the caller's first query; see `acquire`.
+    """
+    return await asyncpg.create_pool(
+        dsn,
+        min_size=settings.db_pool_min_size,
+        max_size=settings.db_pool_max_size,
+        max_inactive_connection_lifetime=settings.db_pool_max_idle,
+        command_timeout=60,
+        statement_cache_size=settings.db_statement_cache_size,
+        init=_init_connection,
+        setup=_ping_connection,
+    )
+
+
+@asynccontextmanager
+async def acquire(pool: asyncpg.Pool) -> AsyncIterator[asyncpg.Connection]:
+    """Check a live connection out of the pool, giving up after `db_pool_timeout` seconds.
+
+    A connection whose ping fails has already been closed by the pool, so the
+    acquire is retried; each stale connection can fail at most once, and all
+    attempts share the one `db_pool_timeout` deadline.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.db_pool_timeout
+    attempts = settings.db_pool_max_size + 1
+    for attempt in range(attempts):
+        try:
+            con = await pool.acquire(timeout=deadline - loop.time())
+            break
+        except _DEAD_CONNECTION_ERRORS:
+            if attempt == attempts - 1 or loop.time() >= deadline:
+                raise
+    try:
+        yield con
+    finally:
+        await pool.release(con)
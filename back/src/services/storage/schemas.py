@@ -3,7 +3,12 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 
 
-@dataclass
+def has_url_or_content(url: Optional[Any], content: Optional[str]) -> bool:
+    """Whether a knowledge item has a URL or non-blank content (the minimum it needs to be stored)."""
+    return bool(url) or bool(content and not content.isspace())
+
+
+@dataclass(slots=True)
 class DataInstance:
     """Represents a single data instance for a pet."""
     pet_id: str
@@ -19,7 +24,7 @@ class DataInstance:
             self.metadata = {}
 
 
-@dataclass
+@dataclass(slots=True)
 class Knowledge:
     """Represents knowledge (URL-content) that can be associated with data instances."""
     url: Optional[str] = None
@@ -35,11 +40,11 @@ class Knowledge:
             self.metadata = {}
         
         # Validate that we have either URL or content
-        if not self.url and (not self.content or self.content.strip() == ""):
+        if not has_url_or_content(self.url, self.content):
             raise ValueError("Knowledge must have either a URL or content")
 
 
-@dataclass
+@dataclass(slots=True)
 class Image:
     """Represents an image that can be associated with data instances."""
     image_url: str
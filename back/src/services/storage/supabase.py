@@ -1,15 +1,164 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
 from supabase import create_client
+import anyio
+import asyncio
+import asyncpg
 import hashlib
-from openai import OpenAI
-import numpy as np
-import json
+import httpx
+from aiocache import cached
+from datetime import datetime
+from uuid import UUID
+from openai import AsyncOpenAI
 
-from .schemas import DataInstance, Knowledge, Image
+from .postgres import acquire
+from .schemas import DataInstance, Knowledge, Image, has_url_or_content
+from src import cache  # registers the "default" alias used by @cached
 from src.scraper.notte import NotteScraper
 
+# Maximum number of Notte scrapes in flight while ingesting one batch of knowledge
+_SCRAPE_CONCURRENCY = 10
+
+# Maximum number of inputs OpenAI accepts in a single embeddings request
+_EMBEDDING_BATCH_SIZE = 2048
+
+# Token budget per embeddings request, kept under OpenAI's 300k cap; tokens are
+# estimated at roughly four characters each
+_EMBEDDING_BATCH_TOKENS = 250_000
+_CHARS_PER_TOKEN = 4
+
+# Embedding model used for both stored knowledge and search queries
+_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+# Upserts knowledge rows from unnest()'d column arrays; the parameter numbers of
+# the six arrays (url, content, title, content_hash, embeddings, metadata) are
+# filled in by the caller.
+_UPSERT_KNOWLEDGE_SQL = """
+    INSERT INTO knowledge (url, content, title, content_hash, embeddings, metadata)
+    SELECT u.url, u.content, u.title, u.content_hash, u.embeddings::vector, u.metadata
+    FROM unnest(${0}::text[], ${1}::text[], ${2}::text[], ${3}::text[], ${4}::text[], ${5}::jsonb[])
+        AS u(url, content, title, content_hash, embeddings, metadata)
+    ON CONFLICT (url, content_hash) DO UPDATE SET
+        content = EXCLUDED.content,
+        title = EXCLUDED.title,
+        embeddings = COALESCE(EXCLUDED.embeddings, knowledge.embeddings),
+        metadata = EXCLUDED.metadata
+"""
+
+# Upserts images from unnest()'d (image_url, url_hash) arrays; the parameter
+# numbers of the two arrays are filled in by the caller.
+_UPSERT_IMAGES_SQL = """
+    INSERT INTO images (image_url, url_hash)
+    SELECT u.image_url, u.url_hash
+    FROM unnest(${0}::text[], ${1}::text[]) AS u(image_url, url_hash)
+    ON CONFLICT (image_url) DO UPDATE SET url_hash = EXCLUDED.url_hash
+"""
+
+# DataInstance columns plus its knowledge and images aggregated as JSON arrays,
+# so a complete instance is fetched by a single query (alias: di)
+_DATAINSTANCE_WITH_CONTENT_COLUMNS = """
+    di.*,
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', k.id, 'url', k.url, 'title', k.title, 'content', k.content,
+            'metadata', k.metadata, 'created_at', k.created_at
+        ))
+        FROM datainstance_knowledge dk
+        JOIN knowledge k ON k.id = dk.knowledge_id
+        WHERE dk.datainstance_id = di.id
+    ), '[]'::json) AS knowledge,
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', i.id, 'image_url', i.image_url, 'alt_text', i.alt_text,
+            'metadata', i.metadata, 'created_at', i.created_at
+        ))
+        FROM datainstance_images dimg
+        JOIN images i ON i.id = dimg.image_id
+        WHERE dimg.datainstance_id = di.id
+    ), '[]'::json) AS images
+"""
+
+# DataInstances fetched per query while streaming a pet's export
+_EXPORT_BATCH_SIZE = 100
+
+# Columns clients may request from a pet's knowledge listing
+_PET_KNOWLEDGE_FIELDS = ("id", "url", "title", "content", "metadata", "created_at")
+
+# The HNSW index returns at most `hnsw.ef_search` candidates (40 by default)
+# before the similarity threshold is applied, so each search widens it to its
+# limit for the current transaction and, on pgvector 0.8+, lets the index keep
+# scanning until enough rows pass the threshold
+_HNSW_SEARCH_SETTINGS_SQL = """
+    SELECT
+        set_config('hnsw.ef_search', $1, true),
+        CASE WHEN (
+            SELECT string_to_array(extversion, '.')::int[] >= '{0,8}'
+            FROM pg_extension WHERE extname = 'vector'
+        ) THEN set_config('hnsw.iterative_scan', 'strict_order', true) END
+"""
+_HNSW_MIN_EF_SEARCH = 40
+
+# Text search documents; these expressions match the GIN indexes in
+# migrations/full_text_search_indexes.sql and must stay identical to them
+_DATAINSTANCE_DOCUMENT = "to_tsvector('english', di.content)"
+_KNOWLEDGE_DOCUMENT = "to_tsvector('english', coalesce(k.title, '') || ' ' || k.content)"
+
+
+def _record_to_dict(record: asyncpg.Record) -> Dict[str, Any]:
+    """Convert an asyncpg record into a JSON-friendly dict (UUIDs and timestamps as strings)."""
+    result = dict(record)
+    for key, value in result.items():
+        if isinstance(value, UUID):
+            result[key] = str(value)
+        elif isinstance(value, datetime):
+            result[key] = value.isoformat()
+    return result
+
+
+def _knowledge_columns(rows: List[Dict[str, Any]]) -> List[List[Any]]:
+    """Split prepared knowledge rows into the column arrays bound to `_UPSERT_KNOWLEDGE_SQL`."""
+    return [
+        [row[column] for row in rows]
+        for column in ("url", "content", "title", "content_hash", "embeddings", "metadata")
+    ]
+
+
+def _embedding_batches(texts: List[str]) -> List[List[str]]:
+    """Split texts into consecutive batches within both the input count and token budget."""
+    batches, batch, batch_tokens = [], [], 0
+    for text in texts:
+        tokens = len(text) // _CHARS_PER_TOKEN + 1
+        if batch and (len(batch) == _EMBEDDING_BATCH_SIZE or batch_tokens + tokens > _EMBEDDING_BATCH_TOKENS):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _query_embedding_key(f, storage: "Supabase", query: str) -> str:
+    """Key a cached query embedding by model and a digest of the query text."""
+    digest = hashlib.blake2b(query.encode("utf-8"), digest_size=16).hexdigest()
+    return f"embedding:{_EMBEDDING_MODEL}:{digest}"
+
+
+def _vector_literal(embedding: Optional[List[float]]) -> Optional[str]:
+    """Format an embedding as a pgvector text literal (bound as `$n::vector`)."""
+    if embedding is None:
+        return None
+    return "[" + ",".join(map(str, embedding)) + "]"
+
+
 class Supabase:
-    def __init__(self, url: str, key: str, openai_api_key: str = None):
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        openai_api_key: str = None,
+        pool: Optional[asyncpg.Pool] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         """    
         -- Enable pgVector extension
         CREATE EXTENSION IF NOT EXISTS vector;
@@ -73,40 +222,75 @@ class Supabase:
         
         -- Full text search indexes
         CREATE INDEX IF NOT EXISTS idx_datainstances_content_fts ON public.datainstances USING gin(to_tsvector('english', content));
-        CREATE INDEX IF NOT EXISTS idx_knowledge_content_fts ON public.knowledge USING gin(to_tsvector('english', content));
+        CREATE INDEX IF NOT EXISTS idx_knowledge_title_content_fts ON public.knowledge USING gin(to_tsvector('english', coalesce(title, '') || ' ' || content));
         
         -- Vector similarity search index for embeddings
-        CREATE INDEX IF NOT EXISTS idx_knowledge_embeddings ON public.knowledge USING ivfflat (embeddings vector_cosine_ops) WITH (lists = 100);
+        CREATE INDEX IF NOT EXISTS knowledge_embedding_hnsw ON public.knowledge USING hnsw (embeddings vector_cosine_ops) WITH (m = 16, ef_construction = 64);
         """
+        # Storage queries go straight to Postgres through the asyncpg pool; the
+        # supabase-py client is kept for the AI routes that still use it
+        self.pool = pool
         self.client = create_client(url, key)
         self.scraper = NotteScraper()
         
         # Initialize OpenAI client with new 1.0.0+ API
         if openai_api_key:
-            self.openai_client = OpenAI(api_key=openai_api_key)
+            # Shares the application's HTTP connection pool when one is given
+            self.openai_client = AsyncOpenAI(api_key=openai_api_key, http_client=http_client)
             self.openai_enabled = True
         else:
             self.openai_client = None
             self.openai_enabled = False
     
+    def _acquire(self):
+        """Check a live connection out of the pool (see `postgres.acquire`)."""
+        return acquire(self.pool)
+    
     def _hash_content(self, content: str) -> str:
         """Generate hash of content for deduplication."""
         return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
     
-    def _generate_embedding(self, text: str) -> Optional[List[float]]:
-        """Generate embeddings using OpenAI's text-embedding-ada-002 model."""
-        if not self.openai_enabled or not self.openai_client:
-            return None
-        
-        try:
-            response = self.openai_client.embeddings.create(
-                input=text,
-                model="text-embedding-ada-002"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            print(f"Error generating embedding: {str(e)}")
-            return None
+    async def _generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Generate embeddings for several texts using OpenAI's text-embedding-ada-002 model.
+
+        Texts are sent in batches sized by `_embedding_batches`. If a batch is
+        rejected, its texts are retried one by one so only the inputs that fail
+        on their own come back as None.
+        """
+        if not self.openai_enabled or not self.openai_client or not texts:
+            return [None] * len(texts)
+        
+        embeddings = []
+        for batch in _embedding_batches(texts):
+            try:
+                embeddings.extend(await self._request_embeddings(batch))
+            except Exception as e:
+                print(f"Error generating embeddings for a batch of {len(batch)}: {str(e)}")
+                if len(batch) == 1:
+                    embeddings.append(None)
+                    continue
+                for text in batch:
+                    try:
+                        embeddings.extend(await self._request_embeddings([text]))
+                    except Exception as e:
+                        print(f"Error generating embedding: {str(e)}")
+                        embeddings.append(None)
+        
+        return embeddings
+    
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch of texts in a single OpenAI request, in input order."""
+        response = await self.openai_client.embeddings.create(input=texts, model=_EMBEDDING_MODEL)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    
+    async def _generate_embedding(self, text: str) -> Optional[List[float]]:
+        """Generate embeddings for a single text."""
+        return (await self._generate_embeddings([text]))[0]
+    
+    @cached(ttl=3600, alias="default", key_builder=_query_embedding_key, skip_cache_func=lambda e: e is None)
+    async def _generate_query_embedding(self, query: str) -> Optional[List[float]]:
+        """Generate the embedding for a search query, cached by query text for an hour."""
+        return await self._generate_embedding(query)
     
     def _prepare_text_for_embedding(self, content: str, title: str = "", url: str = "") -> str:
         """Prepare text for embedding by combining title, content, and optionally URL."""
@@ -160,276 +344,360 @@ class Supabase:
                 "title": ""
             }
     
-    def get_pet(self, pet_id: str) -> Optional[Dict[str, Any]]:
+    async def get_pet(self, pet_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific pet by ID."""
-        result = self.client.table("pets").select("*").eq(
-            "id", pet_id
-        ).execute()
+        async with self._acquire() as con:
+            row = await con.fetchrow("SELECT * FROM pets WHERE id = $1", pet_id)
         
-        return result.data[0] if result.data else None
+        return _record_to_dict(row) if row else None
     
-    def get_user_pets(self, wallet_address: str) -> List[Dict[str, Any]]:
+    async def get_user_pets(self, wallet_address: str) -> List[Dict[str, Any]]:
         """Get all pets for a user by wallet address."""
-        result = self.client.table("pets").select("*").eq(
-            "owner_wallet", wallet_address
-        ).order("created_at", desc=True).execute()
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                "SELECT * FROM pets WHERE owner_wallet = $1 ORDER BY created_at DESC",
+                wallet_address
+            )
         
-        return result.data
+        return [_record_to_dict(row) for row in rows]
     
-    def create_datainstance(self, datainstance: DataInstance) -> Dict[str, Any]:
+    async def create_datainstance(self, datainstance: DataInstance) -> Dict[str, Any]:
         """Create a new DataInstance for a pet."""
         # Extract category and tags from metadata if present
         metadata = datainstance.metadata or {}
         category = metadata.pop("category", "general")  # Remove from metadata and use as column
         tags = metadata.pop("tags", [])  # Remove from metadata and use as column
         
-        data = {
-            "pet_id": datainstance.pet_id,
-            "content": datainstance.content,
-            "content_type": datainstance.content_type,
-            "content_hash": self._hash_content(datainstance.content),
-            "metadata": metadata,  # Now without category and tags
-            "category": category,
-            "tags": tags,
-            "created_at": datainstance.created_at.isoformat()
-        }
-        
-        result = self.client.table("datainstances").insert(data).execute()
-        return result.data[0]
+        async with self._acquire() as con:
+            row = await con.fetchrow(
+                """
+                INSERT INTO datainstances
+                    (pet_id, content, content_type, content_hash, metadata, category, tags, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                RETURNING *
+                """,
+                datainstance.pet_id,
+                datainstance.content,
+                datainstance.content_type,
+                self._hash_content(datainstance.content),
+                metadata,  # Now without category and tags
+                category,
+                tags,
+                datainstance.created_at
+            )
+        return _record_to_dict(row)
     
-    def get_pet_instances(
+    async def get_pet_instances(
         self, 
         pet_id: str,
         limit: int = 100,
         offset: int = 0
     ) -> List[Dict[str, Any]]:
         """Get all DataInstances for a pet."""
-        result = self.client.table("datainstances").select("*").eq(
-            "pet_id", pet_id
-        ).order(
-            "created_at", desc=True
-        ).range(
-            offset, offset + limit - 1
-        ).execute()
-        
-        return result.data
-    
-    def get_pet_knowledge(self, pet_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all knowledge items associated with a specific pet."""
-        # First get all data instances for this pet
-        instances = self.get_pet_instances(pet_id, limit=1000)  # Get all instances
-        instance_ids = [inst["id"] for inst in instances]
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                """
+                SELECT * FROM datainstances
+                WHERE pet_id = $1
+                ORDER BY created_at DESC
+                LIMIT $2 OFFSET $3
+                """,
+                pet_id, limit, offset
+            )
         
-        if not instance_ids:
-            return []
+        return [_record_to_dict(row) for row in rows]
+    
+    async def get_pet_knowledge(
+        self,
+        pet_id: str,
+        limit: int = 25,
+        cursor: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of the knowledge items associated with a specific pet, newest first.
         
-        # Get all knowledge associated with these datainstances
-        knowledge_result = self.client.table("datainstance_knowledge").select(
-            "knowledge:knowledge_id(id, url, title, content, metadata, created_at, embeddings)"
-        ).in_("datainstance_id", instance_ids).order(
-            "knowledge(created_at)", desc=True
-        ).limit(limit).execute()
+        `cursor` is the `next_cursor` of the previous page. `fields` restricts the
+        columns returned to a subset of `_PET_KNOWLEDGE_FIELDS`; `id` and
+        `created_at` are always included since the cursor is built from them.
+        """
+        fields = fields or list(_PET_KNOWLEDGE_FIELDS)
+        invalid = [field for field in fields if field not in _PET_KNOWLEDGE_FIELDS]
+        if invalid:
+            raise ValueError(f"Unknown knowledge fields: {', '.join(invalid)}")
+        columns = ", ".join(f"k.{field}" for field in dict.fromkeys(["id", *fields, "created_at"]))
+        
+        # Knowledge shared by several instances is returned once. One extra row
+        # is fetched to tell whether another page follows.
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                f"""
+                SELECT {columns}
+                FROM knowledge k
+                WHERE k.id IN (
+                    SELECT dk.knowledge_id
+                    FROM datainstance_knowledge dk
+                    JOIN datainstances di ON di.id = dk.datainstance_id
+                    WHERE di.pet_id = $1
+                )
+                AND ($3::uuid IS NULL OR (k.created_at, k.id) < (
+                    SELECT created_at, id FROM knowledge WHERE id = $3::uuid
+                ))
+                ORDER BY k.created_at DESC, k.id DESC
+                LIMIT $2 + 1
+                """,
+                pet_id, limit, cursor
+            )
         
-        # Extract unique knowledge items (avoid duplicates)
-        seen_knowledge_ids = set()
-        unique_knowledge = []
+        items = [_record_to_dict(row) for row in rows[:limit]]
+        return {
+            "items": items,
+            "next_cursor": items[-1]["id"] if len(rows) > limit else None
+        }
+    
+    async def get_datainstance_with_content(self, datainstance_id: str) -> Dict[str, Any]:
+        """Get a DataInstance with all its associated Knowledge and Images."""
+        async with self._acquire() as con:
+            row = await con.fetchrow(
+                f"SELECT {_DATAINSTANCE_WITH_CONTENT_COLUMNS} FROM datainstances di WHERE di.id = $1",
+                datainstance_id
+            )
         
-        for item in knowledge_result.data:
-            knowledge = item["knowledge"]
-            if knowledge and knowledge["id"] not in seen_knowledge_ids:
-                seen_knowledge_ids.add(knowledge["id"])
-                unique_knowledge.append(knowledge)
+        return _record_to_dict(row) if row else None
+    
+    async def get_datainstance_knowledge(self, datainstance_id: str) -> List[Dict[str, Any]]:
+        """Get all knowledge associated with a specific DataInstance."""
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                """
+                SELECT k.id, k.url, k.title, k.content, k.metadata, k.created_at
+                FROM datainstance_knowledge dk
+                JOIN knowledge k ON k.id = dk.knowledge_id
+                WHERE dk.datainstance_id = $1
+                """,
+                datainstance_id
+            )
         
-        return unique_knowledge
+        return [_record_to_dict(row) for row in rows]
     
-    def get_datainstance_with_content(self, datainstance_id: str) -> Dict[str, Any]:
-        """Get a DataInstance with all its associated Knowledge and Images."""
-        instance_result = self.client.table("datainstances").select("*").eq(
-            "id", datainstance_id
-        ).execute()
+    async def get_datainstance_images(self, datainstance_id: str) -> List[Dict[str, Any]]:
+        """Get all images associated with a specific DataInstance."""
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                """
+                SELECT i.id, i.image_url, i.alt_text, i.metadata, i.created_at
+                FROM datainstance_images di
+                JOIN images i ON i.id = di.image_id
+                WHERE di.datainstance_id = $1
+                """,
+                datainstance_id
+            )
         
-        if not instance_result.data:
+        return [_record_to_dict(row) for row in rows]
+
+    async def get_datainstance_pet_id(self, datainstance_id: str) -> Optional[str]:
+        """Get the ID of the pet that owns a DataInstance."""
+        async with self._acquire() as con:
+            pet_id = await con.fetchval(
+                "SELECT pet_id FROM datainstances WHERE id = $1",
+                datainstance_id
+            )
+
+        return str(pet_id) if pet_id else None
+
+    def _image_columns(self, image_urls: List[str]) -> List[List[str]]:
+        """Build the (image_url, url_hash) arrays bound to `_UPSERT_IMAGES_SQL`."""
+        return [image_urls, [self._hash_content(url) for url in image_urls]]
+
+    def _knowledge_from_dict(self, k: Dict[str, Any]) -> Optional[Knowledge]:
+        """Build a Knowledge item from request data, or None when it has neither URL nor content."""
+        # Handle cases where URL and/or content might be provided
+        url = k.get("url")
+        content = k.get("content") or ""
+        
+        # Skip entries that have neither URL nor content
+        if not has_url_or_content(url, content):
             return None
         
-        datainstance = instance_result.data[0]
-        
-        # Get associated knowledge
-        knowledge_result = self.client.table("datainstance_knowledge").select(
-            "knowledge:knowledge_id(id, url, title, content, metadata, created_at)"
-        ).eq("datainstance_id", datainstance_id).execute()
+        return Knowledge(
+            url=url,
+            content=content,
+            title=k.get("title") or "",
+            metadata=k.get("metadata") or {}
+        )
+    
+    async def _prepare_knowledge(self, items: List[Knowledge]) -> List[Dict[str, Any]]:
+        """
+        Scrape missing content and embed knowledge items, returning their column values.
         
-        # Get associated images
-        images_result = self.client.table("datainstance_images").select(
-            "images:image_id(id, image_url, alt_text, metadata, created_at)"
-        ).eq("datainstance_id", datainstance_id).execute()
+        Scrapes run concurrently (at most `_SCRAPE_CONCURRENCY` at a time) and all
+        embeddings are requested in one batch. Rows are de-duplicated on the
+        (url, content_hash) conflict target, since a single INSERT cannot upsert
+        the same row twice.
+        """
+        semaphore = asyncio.Semaphore(_SCRAPE_CONCURRENCY)
         
-        datainstance["knowledge"] = [item["knowledge"] for item in knowledge_result.data]
-        datainstance["images"] = [item["images"] for item in images_result.data]
+        async def fill_content(knowledge: Knowledge) -> None:
+            # Validate that we have either URL or content
+            if not has_url_or_content(knowledge.url, knowledge.content):
+                raise ValueError("Knowledge must have either a URL or content")
+            
+            # If content is not provided or empty, and we have a URL, scrape it
+            if knowledge.url and (not knowledge.content or knowledge.content.isspace()):
+                async with semaphore:
+                    scraped = await anyio.to_thread.run_sync(self._scrape_url_content, knowledge.url)
+                knowledge.content = scraped["content"]
+                # Use scraped title if no title was provided
+                if not knowledge.title:
+                    knowledge.title = scraped["title"]
+            
+            # If we still don't have content, raise an error
+            if not knowledge.content or knowledge.content.isspace():
+                raise ValueError("Could not obtain content from URL or provided content")
+        
+        await asyncio.gather(*(fill_content(knowledge) for knowledge in items))
+        
+        # Generate embeddings for all knowledge content at once
+        embeddings = await self._generate_embeddings([
+            self._prepare_text_for_embedding(
+                content=knowledge.content,
+                title=knowledge.title or "",
+                url=str(knowledge.url) if knowledge.url else ""
+            )
+            for knowledge in items
+        ])
+        
+        rows = {}
+        for knowledge, embedding in zip(items, embeddings):
+            row = {
+                "url": str(knowledge.url) if knowledge.url else None,
+                "content": knowledge.content,
+                "title": knowledge.title,
+                "content_hash": self._hash_content(knowledge.content),
+                "embeddings": _vector_literal(embedding),
+                "metadata": knowledge.metadata
+            }
+            # URL-less knowledge never conflicts, so each row is kept
+            key = (row["url"], row["content_hash"]) if row["url"] else len(rows)
+            rows[key] = row
         
-        return datainstance
+        return list(rows.values())
     
-    def get_datainstance_knowledge(self, datainstance_id: str) -> List[Dict[str, Any]]:
-        """Get all knowledge associated with a specific DataInstance."""
-        knowledge_result = self.client.table("datainstance_knowledge").select(
-            "knowledge:knowledge_id(id, url, title, content, metadata, created_at)"
-        ).eq("datainstance_id", datainstance_id).execute()
+    async def _insert_knowledge(
+        self,
+        datainstance_id: str,
+        items: List[Knowledge]
+    ) -> List[Dict[str, Any]]:
+        """Prepare knowledge items, then upsert and link them to a DataInstance in one statement."""
+        rows = await self._prepare_knowledge(items)
+        if not rows:
+            return []
         
-        return [item["knowledge"] for item in knowledge_result.data]
-    
-    def get_datainstance_images(self, datainstance_id: str) -> List[Dict[str, Any]]:
-        """Get all images associated with a specific DataInstance."""
-        images_result = self.client.table("datainstance_images").select(
-            "images:image_id(id, image_url, alt_text, metadata, created_at)"
-        ).eq("datainstance_id", datainstance_id).execute()
+        async with self._acquire() as con:
+            knowledge_rows = await con.fetch(
+                f"""
+                WITH k AS (
+                    {_UPSERT_KNOWLEDGE_SQL.format(2, 3, 4, 5, 6, 7)}
+                    RETURNING *
+                ), dk AS (
+                    INSERT INTO datainstance_knowledge (datainstance_id, knowledge_id)
+                    SELECT $1, k.id FROM k
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT * FROM k
+                """,
+                datainstance_id,
+                *_knowledge_columns(rows)
+            )
         
-        return [item["images"] for item in images_result.data]
+        return [_record_to_dict(row) for row in knowledge_rows]
     
-    def add_knowledge_to_instance(
+    async def add_knowledge_to_instance(
         self, 
         datainstance_id: str,
         knowledge: Knowledge
     ) -> Dict[str, Any]:
         """Add knowledge to a DataInstance (creates if not exists)."""
-        # Validate that we have either URL or content
-        if not knowledge.url and (not knowledge.content or knowledge.content.strip() == ""):
-            raise ValueError("Knowledge must have either a URL or content")
-        
-        # If content is not provided or empty, and we have a URL, scrape it
-        if knowledge.url and (not knowledge.content or knowledge.content.strip() == ""):
-            scraped = self._scrape_url_content(knowledge.url)
-            knowledge.content = scraped["content"]
-            # Use scraped title if no title was provided
-            if not knowledge.title:
-                knowledge.title = scraped["title"]
-        
-        # If we still don't have content, raise an error
-        if not knowledge.content or knowledge.content.strip() == "":
-            raise ValueError("Could not obtain content from URL or provided content")
-        
-        # Generate embeddings for the knowledge content
-        embedding_text = self._prepare_text_for_embedding(
-            content=knowledge.content,
-            title=knowledge.title or "",
-            url=str(knowledge.url) if knowledge.url else ""
-        )
-        embeddings = self._generate_embedding(embedding_text)
-        
-        knowledge_data = {
-            "url": str(knowledge.url) if knowledge.url else None,
-            "content": knowledge.content,
-            "title": knowledge.title,
-            "content_hash": self._hash_content(knowledge.content),
-            "metadata": knowledge.metadata,
-            "created_at": knowledge.created_at.isoformat()
-        }
-        
-        # Add embeddings if available
-        if embeddings:
-            knowledge_data["embeddings"] = embeddings
-        
-        # Upsert knowledge (insert or update if URL+content_hash combination already exists)
-        knowledge_result = self.client.table("knowledge").upsert(
-            knowledge_data,
-            on_conflict="url,content_hash"
-        ).execute()
-        
-        knowledge_id = knowledge_result.data[0]["id"]
-        
-        # Create relationship
-        relation_data = {
-            "datainstance_id": datainstance_id,
-            "knowledge_id": knowledge_id
-        }
-        
-        self.client.table("datainstance_knowledge").upsert(
-            relation_data,
-            on_conflict="datainstance_id,knowledge_id"
-        ).execute()
-        
-        return knowledge_result.data[0]
+        results = await self._insert_knowledge(datainstance_id, [knowledge])
+        return results[0]
     
-    def bulk_add_knowledge(
+    async def bulk_add_knowledge(
         self,
         datainstance_id: str,
         knowledge_list: List[Dict[str, str]]
     ) -> List[Dict[str, Any]]:
         """Add multiple knowledge entities to a DataInstance."""
-        results = []
-        
-        for k in knowledge_list:
-            # Handle cases where URL and/or content might be provided
-            url = k.get("url")
-            content = k.get("content", "")
-            title = k.get("title", "")
-            
-            # Skip entries that have neither URL nor content
-            if not url and not content.strip():
-                continue
-                
-            knowledge = Knowledge(
-                url=url,
-                content=content,
-                title=title,
-                metadata=k.get("metadata", {})
-            )
-            result = self.add_knowledge_to_instance(datainstance_id, knowledge)
-            results.append(result)
-        
-        return results
+        items = [self._knowledge_from_dict(k) for k in knowledge_list]
+        return await self._insert_knowledge(datainstance_id, [k for k in items if k])
     
-    def add_image_to_instance(
+    async def add_image_to_instance(
         self,
         datainstance_id: str,
         image: Image
     ) -> Dict[str, Any]:
         """Add an image to a DataInstance (creates if not exists)."""
-        image_data = {
-            "image_url": image.image_url,
-            "alt_text": image.alt_text,
-            "url_hash": self._hash_content(image.image_url),
-            "metadata": image.metadata,
-            "created_at": image.created_at.isoformat()
-        }
-        
-        # Upsert image (insert or update if URL already exists)
-        image_result = self.client.table("images").upsert(
-            image_data,
-            on_conflict="image_url"
-        ).execute()
-        
-        image_id = image_result.data[0]["id"]
-        
-        # Create relationship
-        relation_data = {
-            "datainstance_id": datainstance_id,
-            "image_id": image_id
-        }
-        
-        self.client.table("datainstance_images").upsert(
-            relation_data,
-            on_conflict="datainstance_id,image_id"
-        ).execute()
-        
-        return image_result.data[0]
+        async with self._acquire() as con:
+            async with con.transaction():
+                # Upsert image (insert or update if URL already exists)
+                image_row = await con.fetchrow(
+                    """
+                    INSERT INTO images (image_url, alt_text, url_hash, metadata, created_at)
+                    VALUES ($1, $2, $3, $4, $5)
+                    ON CONFLICT (image_url) DO UPDATE SET
+                        alt_text = EXCLUDED.alt_text,
+                        url_hash = EXCLUDED.url_hash,
+                        metadata = EXCLUDED.metadata
+                    RETURNING *
+                    """,
+                    image.image_url,
+                    image.alt_text,
+                    self._hash_content(image.image_url),
+                    image.metadata,
+                    image.created_at
+                )
+                
+                # Create relationship
+                await con.execute(
+                    """
+                    INSERT INTO datainstance_images (datainstance_id, image_id)
+                    VALUES ($1, $2)
+                    ON CONFLICT DO NOTHING
+                    """,
+                    datainstance_id, image_row["id"]
+                )
+        
+        return _record_to_dict(image_row)
     
-    def bulk_add_images(
+    async def bulk_add_images(
         self,
         datainstance_id: str,
         image_urls: List[str]
     ) -> List[Dict[str, Any]]:
-        """Add multiple images to a DataInstance."""
-        results = []
+        """Add multiple images to a DataInstance, upserting and linking them in one statement."""
+        image_urls = list(dict.fromkeys(image_urls))
+        if not image_urls:
+            return []
         
-        for url in image_urls:
-            image = Image(
-                image_url=url
+        async with self._acquire() as con:
+            rows = await con.fetch(
+                f"""
+                WITH i AS (
+                    {_UPSERT_IMAGES_SQL.format(2, 3)}
+                    RETURNING *
+                ), dimg AS (
+                    INSERT INTO datainstance_images (datainstance_id, image_id)
+                    SELECT $1, i.id FROM i
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT * FROM i
+                """,
+                datainstance_id,
+                *self._image_columns(image_urls)
             )
-            result = self.add_image_to_instance(datainstance_id, image)
-            results.append(result)
         
-        return results
+        return [_record_to_dict(row) for row in rows]
     
-    def search_pet_content(
+    async def search_pet_content(
         self,
         pet_id: str,
         search_query: str,
@@ -440,37 +708,55 @@ class Supabase:
         
         Returns results grouped by type.
         """
-        # Search in DataInstances for this pet
-        instances_result = self.client.table("datainstances").select("*").eq(
-            "pet_id", pet_id
-        ).ilike(
-            "content", f"%{search_query}%"
-        ).limit(limit).execute()
-        
-        # Get datainstance IDs to search related knowledge
-        instance_ids = [inst["id"] for inst in instances_result.data]
-        
-        knowledge_results = []
-        if instance_ids:
-            # Get knowledge associated with these datainstances
-            knowledge_relations = self.client.table("datainstance_knowledge").select(
-                "knowledge:knowledge_id(id, url, title, content, metadata, created_at)"
-            ).in_("datainstance_id", instance_ids).execute()
+        async with self._acquire() as con:
+            # Search in DataInstances for this pet
+            instances = await con.fetch(
+                f"""
+                SELECT di.* FROM datainstances di, plainto_tsquery('english', $2) query
+                WHERE di.pet_id = $1 AND {_DATAINSTANCE_DOCUMENT} @@ query
+                ORDER BY ts_rank({_DATAINSTANCE_DOCUMENT}, query) DESC
+                LIMIT $3
+                """,
+                pet_id, search_query, limit
+            )
             
-            # Also search knowledge content directly
-            knowledge_content = self.client.table("knowledge").select("*").ilike(
-                "content", f"%{search_query}%"
-            ).limit(limit).execute()
+            # Get datainstance IDs to search related knowledge
+            instance_ids = [inst["id"] for inst in instances]
             
-            knowledge_results = ([item["knowledge"] for item in knowledge_relations.data] + 
-                               knowledge_content.data)
+            knowledge_results = []
+            if instance_ids:
+                # Get knowledge associated with these datainstances
+                knowledge_relations = await con.fetch(
+                    """
+                    SELECT k.id, k.url, k.title, k.content, k.metadata, k.created_at
+                    FROM datainstance_knowledge dk
+                    JOIN knowledge k ON k.id = dk.knowledge_id
+                    WHERE dk.datainstance_id = ANY($1::uuid[])
+                    """,
+                    instance_ids
+                )
+                
+                # Also search knowledge content directly
+                knowledge_content = await con.fetch(
+                    f"""
+                    SELECT k.id, k.url, k.title, k.content, k.metadata, k.created_at
+                    FROM knowledge k, plainto_tsquery('english', $1) query
+                    WHERE {_KNOWLEDGE_DOCUMENT} @@ query
+                    ORDER BY ts_rank({_KNOWLEDGE_DOCUMENT}, query) DESC
+                    LIMIT $2
+                    """,
+                    search_query, limit
+                )
+                
+                knowledge_results = ([_record_to_dict(row) for row in knowledge_relations] + 
+                                   [_record_to_dict(row) for row in knowledge_content])
         
         return {
-            "datainstances": instances_result.data,
+            "datainstances": [_record_to_dict(row) for row in instances],
             "knowledge": knowledge_results
         }
     
-    def search_user_content(
+    async def search_user_content(
         self,
         wallet_address: str,
         search_query: str,
@@ -479,47 +765,55 @@ class Supabase:
         """
         Search across all user's pets content.
         """
-        # Get user's pets first
-        pets = self.get_user_pets(wallet_address)
-        pet_ids = [pet["id"] for pet in pets]
-        
-        if not pet_ids:
-            return {"datainstances": [], "knowledge": []}
-        
-        # Search in DataInstances for all user's pets
-        instances_result = self.client.table("datainstances").select("*").in_(
-            "pet_id", pet_ids
-        ).ilike(
-            "content", f"%{search_query}%"
-        ).limit(limit).execute()
-        
-        # Search in Knowledge (related to user's datainstances)
-        instance_ids = [inst["id"] for inst in instances_result.data]
-        knowledge_results = []
-        
-        if instance_ids:
-            knowledge_relations = self.client.table("datainstance_knowledge").select(
-                "knowledge:knowledge_id(id, url, title, content, metadata, created_at)"
-            ).in_("datainstance_id", instance_ids).execute()
+        async with self._acquire() as con:
+            # Search in DataInstances for all user's pets
+            instances = await con.fetch(
+                f"""
+                SELECT di.* FROM datainstances di
+                JOIN pets p ON p.id = di.pet_id
+                CROSS JOIN plainto_tsquery('english', $2) query
+                WHERE p.owner_wallet = $1 AND {_DATAINSTANCE_DOCUMENT} @@ query
+                ORDER BY ts_rank({_DATAINSTANCE_DOCUMENT}, query) DESC
+                LIMIT $3
+                """,
+                wallet_address, search_query, limit
+            )
+            
+            # Search in Knowledge (related to user's datainstances)
+            instance_ids = [inst["id"] for inst in instances]
+            knowledge_results = []
             
-            knowledge_results = [item["knowledge"] for item in knowledge_relations.data]
+            if instance_ids:
+                knowledge_relations = await con.fetch(
+                    """
+                    SELECT k.id, k.url, k.title, k.content, k.metadata, k.created_at
+                    FROM datainstance_knowledge dk
+                    JOIN knowledge k ON k.id = dk.knowledge_id
+                    WHERE dk.datainstance_id = ANY($1::uuid[])
+                    """,
+                    instance_ids
+                )
+                
+                knowledge_results = [_record_to_dict(row) for row in knowledge_relations]
         
         return {
-            "datainstances": instances_result.data,
+            "datainstances": [_record_to_dict(row) for row in instances],
             "knowledge": knowledge_results
         }
         
-    def get_user_statistics(self, wallet_address: str) -> Dict[str, Any]:
+    async def get_user_statistics(self, wallet_address: str) -> Dict[str, Any]:
         """Get comprehensive statistics for a user."""
-        pets = self.get_user_pets(wallet_address)
-        pet_ids = [pet["id"] for pet in pets]
-        
-        instances_count = 0
-        if pet_ids:
-            instances = self.client.table("datainstances").select(
-                "id", count="exact"
-            ).in_("pet_id", pet_ids).execute()
-            instances_count = instances.count
+        pets = await self.get_user_pets(wallet_address)
+        
+        async with self._acquire() as con:
+            instances_count = await con.fetchval(
+                """
+                SELECT count(*) FROM datainstances di
+                JOIN pets p ON p.id = di.pet_id
+                WHERE p.owner_wallet = $1
+                """,
+                wallet_address
+            )
         
         return {
             "wallet_address": wallet_address,
@@ -528,7 +822,7 @@ class Supabase:
             "pets": pets
         }
     
-    def create_complete_datainstance(
+    async def create_complete_datainstance(
         self,
         pet_id: str,
         content: str,
@@ -541,147 +835,195 @@ class Supabase:
     ) -> Dict[str, Any]:
         """
         Convenience method to create a DataInstance with all its relations at once.
-        """
-        # Prepare metadata to include category and tags
-        final_metadata = metadata or {}
-        
-        # Add category and tags to metadata
-        final_metadata["category"] = category
-        final_metadata["tags"] = tags or []
         
+        The instance, its knowledge, its images and both junction tables are
+        written by a single statement, so the whole request costs one query
+        (plus the pool's liveness ping) and either everything is stored or
+        nothing is.
+        """
         datainstance = DataInstance(
             pet_id=pet_id,
             content=content,
             content_type=content_type,
-            metadata=final_metadata
+            metadata=metadata
         )
         
-        instance_result = self.create_datainstance(datainstance)
-        instance_id = instance_result["id"]
-        
-        if knowledge_list:
-            self.bulk_add_knowledge(instance_id, knowledge_list)
-        
-        if image_urls:
-            self.bulk_add_images(instance_id, image_urls)
+        # Scraping and embeddings happen before the insert
+        knowledge_items = [self._knowledge_from_dict(k) for k in knowledge_list or []]
+        knowledge_rows = await self._prepare_knowledge([k for k in knowledge_items if k])
+        image_urls = list(dict.fromkeys(image_urls or []))
+        
+        async with self._acquire() as con:
+            row = await con.fetchrow(
+                f"""
+                WITH di AS (
+                    INSERT INTO datainstances
+                        (pet_id, content, content_type, content_hash, metadata, category, tags, created_at)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    RETURNING *
+                ), k AS (
+                    {_UPSERT_KNOWLEDGE_SQL.format(9, 10, 11, 12, 13, 14)}
+                    RETURNING id, url, title, content, metadata, created_at
+                ), dk AS (
+                    INSERT INTO datainstance_knowledge (datainstance_id, knowledge_id)
+                    SELECT di.id, k.id FROM di, k
+                    ON CONFLICT DO NOTHING
+                ), i AS (
+                    {_UPSERT_IMAGES_SQL.format(15, 16)}
+                    RETURNING id, image_url, alt_text, metadata, created_at
+                ), dimg AS (
+                    INSERT INTO datainstance_images (datainstance_id, image_id)
+                    SELECT di.id, i.id FROM di, i
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT
+                    di.*,
+                    COALESCE((SELECT json_agg(k) FROM k), '[]'::json) AS knowledge,
+                    COALESCE((SELECT json_agg(i) FROM i), '[]'::json) AS images
+                FROM di
+                """,
+                datainstance.pet_id,
+                datainstance.content,
+                datainstance.content_type,
+                self._hash_content(datainstance.content),
+                datainstance.metadata,
+                category,
+                tags or [],
+                datainstance.created_at,
+                *_knowledge_columns(knowledge_rows),
+                *self._image_columns(image_urls)
+            )
         
-        return self.get_datainstance_with_content(instance_id)
+        return _record_to_dict(row)
     
-    def export_pet_data(self, pet_id: str) -> Dict[str, Any]:
+    async def iter_pet_instances(self, pet_id: str) -> AsyncIterator[Dict[str, Any]]:
         """
-        Export complete pet data with all instances, knowledge, and images.
-        """
-        pet = self.get_pet(pet_id)
-        if not pet:
-            return None
+        Yield every DataInstance of a pet with its knowledge and images, newest first.
         
-        instances = self.get_pet_instances(pet_id, limit=1000)
-        
-        complete_instances = []
-        for instance in instances:
-            complete = self.get_datainstance_with_content(instance["id"])
-            complete_instances.append(complete)
-        
-        pet["instances"] = complete_instances
-        return pet
+        Instances are read in keyset batches of `_EXPORT_BATCH_SIZE` on
+        (created_at, id), and the connection goes back to the pool before a
+        batch is yielded, so a slow client never holds a connection.
+        """
+        after = (None, None)
+        while True:
+            async with self._acquire() as con:
+                rows = await con.fetch(
+                    f"""
+                    SELECT {_DATAINSTANCE_WITH_CONTENT_COLUMNS} FROM datainstances di
+                    WHERE di.pet_id = $1
+                    AND ($3::timestamptz IS NULL OR (di.created_at, di.id) < ($3, $4::uuid))
+                    ORDER BY di.created_at DESC, di.id DESC
+                    LIMIT $2
+                    """,
+                    pet_id, _EXPORT_BATCH_SIZE, *after
+                )
+            
+            for row in rows:
+                yield _record_to_dict(row)
+            if len(rows) < _EXPORT_BATCH_SIZE:
+                return
+            after = (rows[-1]["created_at"], rows[-1]["id"])
     
-    def add_knowledge_from_urls(
+    async def add_knowledge_from_urls(
         self,
         datainstance_id: str,
         urls: List[str],
         instruction: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Add knowledge to a DataInstance from a list of URLs (content will be scraped)."""
-        results = []
-        
-        for url in urls:
-            knowledge = Knowledge(
+        items = [
+            Knowledge(
                 url=url,
                 content="",
                 title="",  
                 metadata={"scraped": True, "instruction": instruction} if instruction else {"scraped": True}
             )
-            result = self.add_knowledge_to_instance(datainstance_id, knowledge)
-            results.append(result)
-        
-        return results
+            for url in urls
+        ]
+        return await self._insert_knowledge(datainstance_id, items)
 
-    def semantic_search_knowledge(
+    async def _semantic_search(
         self,
         query: str,
-        limit: int = 20,
-        similarity_threshold: float = 0.7
+        limit: int,
+        similarity_threshold: float,
+        scope_sql: str = "",
+        scope_args: tuple = ()
     ) -> List[Dict[str, Any]]:
         """
-        Perform semantic search across all knowledge using embeddings.
-        
-        Args:
-            query: Search query text
-            limit: Maximum number of results to return
-            similarity_threshold: Minimum similarity score (0-1)
-        
-        Returns:
-            List of knowledge items with similarity scores
+        Rank knowledge by cosine similarity to the query embedding inside Postgres.
+        
+        `scope_sql` is a subquery selecting the knowledge IDs to search, with its
+        parameters numbered from $4 and bound from `scope_args`; when empty, all
+        knowledge is searched through the HNSW index. A scope is usually a small
+        share of all knowledge, so its rows are collected first (a materialized
+        CTE the index cannot reach into) and ranked exactly rather than
+        filtered out of the index's approximate candidates. The embeddings
+        themselves are not returned. The HNSW settings are transaction-local,
+        so they are safe behind a transaction-mode pooler.
         """
         if not self.openai_enabled:
             raise ValueError("OpenAI is not enabled. Cannot perform semantic search.")
         
-        # Generate embedding for the query
-        query_embedding = self._generate_embedding(query)
+        query_embedding = await self._generate_query_embedding(query)
         if not query_embedding:
             return []
         
+        if scope_sql:
+            scope = f"""
+                WITH scoped AS MATERIALIZED (
+                    SELECT * FROM knowledge WHERE id IN ({scope_sql})
+                )
+            """
+            source = "scoped"
+        else:
+            scope = ""
+            source = "knowledge"
         try:
-            # Get all knowledge items (filter out null embeddings in Python)
-            result = self.client.table("knowledge").select("*").execute()
-            
-            # Calculate similarities manually using numpy
-            import numpy as np
+            async with self._acquire() as con, con.transaction():
+                if not scope_sql:
+                    await con.execute(_HNSW_SEARCH_SETTINGS_SQL, str(max(limit, _HNSW_MIN_EF_SEARCH)))
+                rows = await con.fetch(
+                    f"""
+                    {scope}
+                    SELECT
+                        k.id, k.url, k.content, k.title, k.content_hash, k.metadata, k.created_at,
+                        1 - (k.embeddings <=> $1::vector) AS similarity
+                    FROM {source} k
+                    WHERE k.embeddings IS NOT NULL
+                    AND 1 - (k.embeddings <=> $1::vector) >= $2
+                    ORDER BY k.embeddings <=> $1::vector
+                    LIMIT $3
+                    """,
+                    _vector_literal(query_embedding), similarity_threshold, limit, *scope_args
+                )
             
-            filtered_results = []
-            query_vec = np.array(query_embedding)
-            
-            for item in result.data:
-                # Skip items without embeddings
-                if not item.get('embeddings') or item['embeddings'] is None:
-                    continue
-                    
-                try:
-                    # Handle different embedding formats (string vs list)
-                    embeddings = item['embeddings']
-                    if isinstance(embeddings, str):
-                        # If it's a string, try to parse it as JSON
-                        import json
-                        try:
-                            embeddings = json.loads(embeddings)
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse embeddings as JSON for item {item.get('id')}")
-                            continue
-                    
-                    # Convert to numpy array
-                    item_vec = np.array(embeddings, dtype=np.float32)
-                    query_vec_float = np.array(query_vec, dtype=np.float32)
-                    
-                    # Calculate cosine similarity
-                    similarity = np.dot(query_vec_float, item_vec) / (np.linalg.norm(query_vec_float) * np.linalg.norm(item_vec))
-                    
-                    if similarity >= similarity_threshold:
-                        item['similarity'] = float(similarity)
-                        filtered_results.append(item)
-                except Exception as e:
-                    print(f"Error calculating similarity for item {item.get('id')}: {e}")
-                    continue
-            
-            # Sort by similarity descending
-            filtered_results.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            return filtered_results[:limit]
+            return [_record_to_dict(row) for row in rows]
             
         except Exception as e:
             print(f"Error in semantic search: {str(e)}")
             return []
     
-    def semantic_search_pet_knowledge(
+    async def semantic_search_knowledge(
+        self,
+        query: str,
+        limit: int = 20,
+        similarity_threshold: float = 0.7
+    ) -> List[Dict[str, Any]]:
+        """
+        Perform semantic search across all knowledge using embeddings.
+        
+        Args:
+            query: Search query text
+            limit: Maximum number of results to return
+            similarity_threshold: Minimum similarity score (0-1)
+        
+        Returns:
+            List of knowledge items with similarity scores
+        """
+        return await self._semantic_search(query, limit, similarity_threshold)
+    
+    async def semantic_search_pet_knowledge(
         self,
         pet_id: str,
         query: str,
@@ -691,83 +1033,18 @@ class Supabase:
         """
         Perform semantic search across a specific pet's knowledge.
         """
-        if not self.openai_enabled:
-            raise ValueError("OpenAI is not enabled. Cannot perform semantic search.")
-        
-        query_embedding = self._generate_embedding(query)
-        if not query_embedding:
-            return []
-        
-        # Get all datainstance IDs for this pet
-        instances = self.get_pet_instances(pet_id, limit=1000)
-        instance_ids = [inst["id"] for inst in instances]
-        
-        if not instance_ids:
-            return []
-        
-        try:
-            # First get knowledge IDs associated with this pet's instances
-            knowledge_relations = self.client.table("datainstance_knowledge").select(
-                "knowledge_id"
-            ).in_("datainstance_id", instance_ids).execute()
-            
-            knowledge_ids = [rel["knowledge_id"] for rel in knowledge_relations.data]
-            
-            if not knowledge_ids:
-                return []
-            
-            # Now search within those knowledge items using vector similarity
-            result = self.client.table("knowledge").select(
-                "*"
-            ).in_(
-                "id", knowledge_ids
-            ).execute()
-            
-            import numpy as np
-            
-            filtered_results = []
-            query_vec = np.array(query_embedding)
-            
-            for item in result.data:
-                # Skip items without embeddings
-                if not item.get('embeddings') or item['embeddings'] is None:
-                    continue
-                    
-                try:
-                    # Handle different embedding formats (string vs list)
-                    embeddings = item['embeddings']
-                    if isinstance(embeddings, str):
-                        # If it's a string, try to parse it as JSON
-                        try:
-                            embeddings = json.loads(embeddings)
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse embeddings as JSON for item {item.get('id')}")
-                            continue
-                    
-                    # Convert to numpy array
-                    item_vec = np.array(embeddings, dtype=np.float32)
-                    query_vec_float = np.array(query_vec, dtype=np.float32)
-                    
-                    # Calculate cosine similarity
-                    similarity = np.dot(query_vec_float, item_vec) / (np.linalg.norm(query_vec_float) * np.linalg.norm(item_vec))
-                    
-                    if similarity >= similarity_threshold:
-                        item['similarity'] = float(similarity)
-                        filtered_results.append(item)
-                except Exception as e:
-                    print(f"Error calculating similarity for item {item.get('id')}: {e}")
-                    continue
-            
-            # Sort by similarity descending
-            filtered_results.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            return filtered_results[:limit]
-            
-        except Exception as e:
-            print(f"Error in pet semantic search: {str(e)}")
-            return []
+        return await self._semantic_search(
+            query, limit, similarity_threshold,
+            scope_sql="""
+                SELECT dk.knowledge_id
+                FROM datainstance_knowledge dk
+                JOIN datainstances di ON di.id = dk.datainstance_id
+                WHERE di.pet_id = $4
+            """,
+            scope_args=(pet_id,)
+        )
     
-    def semantic_search_user_knowledge(
+    async def semantic_search_user_knowledge(
         self,
         wallet_address: str,
         query: str,
@@ -777,153 +1054,87 @@ class Supabase:
         """
         Perform semantic search across all knowledge for a user's pets.
         """
-        if not self.openai_enabled:
-            raise ValueError("OpenAI is not enabled. Cannot perform semantic search.")
+        return await self._semantic_search(
+            query, limit, similarity_threshold,
+            scope_sql="""
+                SELECT dk.knowledge_id
+                FROM datainstance_knowledge dk
+                JOIN datainstances di ON di.id = dk.datainstance_id
+                JOIN pets p ON p.id = di.pet_id
+                WHERE p.owner_wallet = $4
+            """,
+            scope_args=(wallet_address,)
+        )
+
+
+# Example usage for testing
+if __name__ == "__main__":
+    import asyncio
+    import os
+
+    from .postgres import create_pool
+
+    async def main():
+        # You'll need to set these environment variables
+        storage = Supabase(
+            url=os.getenv("SUPABASE_URL", "https://your-project.supabase.co"),
+            key=os.getenv("SUPABASE_KEY", "your-anon-key"),
+            pool=await create_pool(os.environ["SUPABASE_DB_URL"])
+        )
         
-        # Get all user's pets
-        pets = self.get_user_pets(wallet_address)
-        pet_ids = [pet["id"] for pet in pets]
+        # Test with a sample pet ID (replace with actual pet ID)
+        pet_id = "sample-pet-id"
+        wallet_address = "sample-wallet-address"
         
-        if not pet_ids:
-            return []
+        # Create a complete DataInstance with knowledge and images
+        instance = await storage.create_complete_datainstance(
+            pet_id=pet_id,
+            content="My pet learned about machine learning today from various sources...",
+            content_type="text",
+            knowledge_list=[
+                {
+                    "url": "https://pytorch.org/tutorials/",
+                    # content will be automatically scraped
+                },
+                {
+                    "url": "https://tensorflow.org/guide",
+                    "content": "TensorFlow guide content...",  # provided content (won't be scraped)
+                    "title": "TensorFlow Guide"
+                }
+            ],
+            image_urls=[
+                "https://pytorch.org/assets/images/pytorch-logo.png",
+                "https://tensorflow.org/images/tf-logo.png"
+            ],
+            metadata={"tags": ["ML", "learning"], "importance": "high"}
+        )
         
-        query_embedding = self._generate_embedding(query)
-        if not query_embedding:
-            return []
+        print(f"Created DataInstance with {len(instance['knowledge'])} knowledge items and {len(instance['images'])} images")
         
-        # Get all datainstance IDs for all user's pets
-        all_instance_ids = []
-        for pet_id in pet_ids:
-            instances = self.get_pet_instances(pet_id, limit=1000)
-            all_instance_ids.extend([inst["id"] for inst in instances])
+        # Add knowledge from URLs only (content will be scraped)
+        additional_knowledge = await storage.add_knowledge_from_urls(
+            datainstance_id=instance["id"],
+            urls=[
+                "https://scikit-learn.org/stable/",
+                "https://keras.io/"
+            ],
+            instruction="Extract the main content and title from this machine learning documentation"
+        )
         
-        if not all_instance_ids:
-            return []
+        print(f"Added {len(additional_knowledge)} additional knowledge items from URLs")
         
-        try:
-            # Get knowledge IDs associated with user's instances
-            knowledge_relations = self.client.table("datainstance_knowledge").select(
-                "knowledge_id"
-            ).in_("datainstance_id", all_instance_ids).execute()
-            
-            knowledge_ids = [rel["knowledge_id"] for rel in knowledge_relations.data]
-            
-            if not knowledge_ids:
-                return []
-            
-            # Search within those knowledge items
-            result = self.client.table("knowledge").select(
-                "*"
-            ).in_(
-                "id", knowledge_ids
-            ).execute()
-            
-            import numpy as np
-            
-            filtered_results = []
-            query_vec = np.array(query_embedding)
-            
-            for item in result.data:
-                # Skip items without embeddings
-                if not item.get('embeddings') or item['embeddings'] is None:
-                    continue
-                    
-                try:
-                    # Handle different embedding formats (string vs list)
-                    embeddings = item['embeddings']
-                    if isinstance(embeddings, str):
-                        # If it's a string, try to parse it as JSON
-                        try:
-                            embeddings = json.loads(embeddings)
-                        except json.JSONDecodeError:
-                            print(f"Failed to parse embeddings as JSON for item {item.get('id')}")
-                            continue
-                    
-                    # Convert to numpy array
-                    item_vec = np.array(embeddings, dtype=np.float32)
-                    query_vec_float = np.array(query_vec, dtype=np.float32)
-                    
-                    # Calculate cosine similarity
-                    similarity = np.dot(query_vec_float, item_vec) / (np.linalg.norm(query_vec_float) * np.linalg.norm(item_vec))
-                    
-                    if similarity >= similarity_threshold:
-                        item['similarity'] = float(similarity)
-                        filtered_results.append(item)
-                except Exception as e:
-                    print(f"Error calculating similarity for item {item.get('id')}: {e}")
-                    continue
-            
-            # Sort by similarity descending
-            filtered_results.sort(key=lambda x: x['similarity'], reverse=True)
-            
-            return filtered_results[:limit]
-            
-        except Exception as e:
-            print(f"Error in user semantic search: {str(e)}")
-            return []
-
+        # Search pet content
+        search_results = await storage.search_pet_content(pet_id, "machine learning")
+        print(f"Found {len(search_results['datainstances'])} instances and {len(search_results['knowledge'])} knowledge items")
+        
+        # Export complete pet data
+        instances = [instance async for instance in storage.iter_pet_instances(pet_id)]
+        print(f"Exported pet data with {len(instances)} instances")
+        
+        # Get user statistics
+        stats = await storage.get_user_statistics(wallet_address)
+        print(f"User statistics: {stats}")
+        
+        await storage.pool.close()
 
-# Example usage for testing
-if __name__ == "__main__":
-    import os
-    from datetime import datetime
-    
-    # You'll need to set these environment variables
-    storage = Supabase(
-        url=os.getenv("SUPABASE_URL", "https://your-project.supabase.co"),
-        key=os.getenv("SUPABASE_KEY", "your-anon-key")
-    )
-    
-    # Test with a sample pet ID (replace with actual pet ID)
-    pet_id = "sample-pet-id"
-    wallet_address = "sample-wallet-address"
-    
-    # Create a complete DataInstance with knowledge and images
-    instance = storage.create_complete_datainstance(
-        pet_id=pet_id,
-        content="My pet learned about machine learning today from various sources...",
-        content_type="text",
-        knowledge_list=[
-            {
-                "url": "https://pytorch.org/tutorials/",
-                # content will be automatically scraped
-            },
-            {
-                "url": "https://tensorflow.org/guide",
-                "content": "TensorFlow guide content...",  # provided content (won't be scraped)
-                "title": "TensorFlow Guide"
-            }
-        ],
-        image_urls=[
-            "https://pytorch.org/assets/images/pytorch-logo.png",
-            "https://tensorflow.org/images/tf-logo.png"
-        ],
-        metadata={"tags": ["ML", "learning"], "importance": "high"}
-    )
-    
-    print(f"Created DataInstance with {len(instance['knowledge'])} knowledge items and {len(instance['images'])} images")
-    
-    # Add knowledge from URLs only (content will be scraped)
-    additional_knowledge = storage.add_knowledge_from_urls(
-        datainstance_id=instance["id"],
-        urls=[
-            "https://scikit-learn.org/stable/",
-            "https://keras.io/"
-        ],
-        instruction="Extract the main content and title from this machine learning documentation"
-    )
-    
-    print(f"Added {len(additional_knowledge)} additional knowledge items from URLs")
-    
-    # Search pet content
-    search_results = storage.search_pet_content(pet_id, "machine learning")
-    print(f"Found {len(search_results['datainstances'])} instances and {len(search_results['knowledge'])} knowledge items")
-    
-    # Export complete pet data
-    export = storage.export_pet_data(pet_id)
-    if export:
-        print(f"Exported pet data with {len(export['instances'])} instances")
-    
-    # Get user statistics
-    stats = storage.get_user_statistics(wallet_address)
-    print(f"User statistics: {stats}")
\ No newline at end of file
+    asyncio.run(main())
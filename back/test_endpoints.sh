@@ -459,14 +459,14 @@ run_test "Invalid Knowledge - Neither URL nor Content" \
     "curl -X POST '$API_BASE_URL/api/v1/storage/datainstances/$TEST_INSTANCE_ID/knowledge' \
     -H 'Content-Type: application/json' \
     -d '[{\"title\": \"Empty Knowledge\", \"metadata\": {\"test\": \"invalid\"}}]'" \
-    "400"
+    "422"
 
 # Test 63: Invalid Knowledge - Empty Content and No URL
 run_test "Invalid Knowledge - Empty Content and No URL" \
     "curl -X POST '$API_BASE_URL/api/v1/storage/datainstances/$TEST_INSTANCE_ID/knowledge' \
     -H 'Content-Type: application/json' \
     -d '[{\"content\": \"\", \"title\": \"Empty Content\"}]'" \
-    "400"
+    "422"
 
 # Test 64: Create Data Instance with Text-Only Knowledge
 run_test "Create Data Instance with Text-Only Knowledge" \
@@ -134,7 +134,7 @@ export default function AddDataPage() {
       try {
         const response = await fetch(`${API_BASE_URL}/api/v1/storage/pets/${activePet.id}/knowledge?limit=20`);
         if (response.ok) {
-          const knowledge = await response.json();
+          const { items: knowledge } = await response.json();
           setPetKnowledge(knowledge);
         }
       } catch (error) {
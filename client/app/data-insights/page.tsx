@@ -125,7 +125,7 @@ export default function DataInsightsPage() {
         }
 
         if (knowledgeResponse.ok) {
-          knowledge = await knowledgeResponse.json();
+          ({ items: knowledge } = await knowledgeResponse.json());
           setPetKnowledge(knowledge);
           console.log(`Fetched ${knowledge.length} knowledge items for pet ${selectedPet.name}`);
           
@@ -534,7 +534,7 @@ export default function DataInsightsPage() {
       }
 
       if (knowledgeResponse.ok) {
-        knowledge = await knowledgeResponse.json();
+        ({ items: knowledge } = await knowledgeResponse.json());
         setPetKnowledge(knowledge);
         
         // Keep existing selections if possible, or select all if new data
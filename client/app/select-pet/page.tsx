@@ -201,7 +201,7 @@ export default function SelectPetPage() {
             const knowledgeResponse = await fetch(`${API_BASE_URL}/api/v1/storage/pets/${pet.id}/knowledge?limit=10`);
             
             if (knowledgeResponse.ok) {
-              knowledge = await knowledgeResponse.json();
+              ({ items: knowledge } = await knowledgeResponse.json());
             } else {
               console.log(`Knowledge API returned ${knowledgeResponse.status} for pet ${pet.id}`);
             }